@@ -6,6 +6,8 @@ Usage:
     python scripts/build.py --release    # Release build (auto bump, optional tag+release)
     python scripts/build.py --release --force  # Force full rebuild (ignores smart detection)
     python scripts/build.py --local      # Dev server with hot reload (cargo tauri dev)
+    python scripts/build.py --pgo        # Profile-guided release build (two passes)
+    python scripts/build.py --dev --no-cache   # Build without sccache
 """
 
 import argparse
@@ -16,19 +18,57 @@ import re
 import shutil
 import subprocess
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 # --- Constants ---------------------------------------------------------------
 
 ROOT = Path(__file__).resolve().parent.parent
-EXE_SRC = ROOT / "src-tauri" / "target" / "release" / "cosmos-terminal.exe"
-BUNDLE_DIR = ROOT / "src-tauri" / "target" / "release" / "bundle"
 PACKAGE_JSON = ROOT / "package.json"
+PACKAGE_LOCK = ROOT / "package-lock.json"
+# Hash of the package-lock.json that node_modules was last installed from
+LOCK_HASH_FILE = ROOT / "node_modules" / ".cosmos-lockhash"
+# npm's own record of what is installed, rewritten by every npm install/ci
+NPM_HIDDEN_LOCK = ROOT / "node_modules" / ".package-lock.json"
 CARGO_TOML = ROOT / "src-tauri" / "Cargo.toml"
+CARGO_LOCK = ROOT / "src-tauri" / "Cargo.lock"
 TAURI_CONF = ROOT / "src-tauri" / "tauri.conf.json"
-RUST_HASH_FILE = ROOT / "src-tauri" / "target" / ".rust-build-hash"
 APP_DIR_ENV = os.environ.get("COSMOS_TERMINAL_APP_DIR")
 
+
+def default_target_dir() -> Path:
+    """Cargo target dir shared by every checkout/worktree of the repo."""
+    if os.environ.get("CARGO_TARGET_DIR"):
+        return Path(os.environ["CARGO_TARGET_DIR"]).resolve()
+    local_app_data = os.environ.get("LOCALAPPDATA")
+    if sys.platform == "win32" and local_app_data:
+        return Path(local_app_data) / "cosmos-terminal" / "target"
+    return Path.home() / ".cache" / "cosmos-terminal" / "target"
+
+
+# Derived from the target dir; rebound by set_target_dir()
+TARGET_DIR = default_target_dir()
+EXE_SRC = TARGET_DIR / "release" / "cosmos-terminal.exe"
+BUNDLE_DIR = TARGET_DIR / "release" / "bundle"
+# Lives next to the exe it describes, so worktrees sharing the target dir
+# know which sources the current exe was built from
+RUST_HASH_FILE = TARGET_DIR / ".rust-build-hash"
+
+# Fully optimized release profile, applied on top of Cargo.toml so shipped
+# builds do not depend on [profile.release] staying in sync
+RELEASE_PROFILE_ENV = {
+    "CARGO_PROFILE_RELEASE_LTO": "fat",
+    "CARGO_PROFILE_RELEASE_CODEGEN_UNITS": "1",
+    "CARGO_PROFILE_RELEASE_OPT_LEVEL": "3",
+    "CARGO_PROFILE_RELEASE_PANIC": "abort",
+    "CARGO_PROFILE_RELEASE_STRIP": "symbols",
+}
+
+# First top-level "version" key in package.json / tauri.conf.json
+JSON_VERSION_RE = re.compile(r'("version"\s*:\s*")([^"]+)(")')
+# [package] version line in Cargo.toml
+CARGO_VERSION_RE = re.compile(r'^(version\s*=\s*")[\d.]+(")', re.MULTILINE)
+
 # ANSI helpers
 RESET = "\033[0m"
 BOLD = "\033[1m"
@@ -38,12 +78,27 @@ YELLOW = "\033[1;33m"
 RED = "\033[1;31m"
 DIM = "\033[2m"
 
+# Set from CLI flags in main()
+_use_sccache = True
+_fetch_before_build = False  # --online; cleared after the first fetch
+
+
+def set_target_dir(target_dir: Path) -> None:
+    global TARGET_DIR, EXE_SRC, BUNDLE_DIR, RUST_HASH_FILE
+    TARGET_DIR = target_dir.resolve()
+    EXE_SRC = TARGET_DIR / "release" / "cosmos-terminal.exe"
+    BUNDLE_DIR = TARGET_DIR / "release" / "bundle"
+    RUST_HASH_FILE = TARGET_DIR / ".rust-build-hash"
+
+
 # --- Version management ------------------------------------------------------
 
 
 def read_version() -> str:
-    data = json.loads(PACKAGE_JSON.read_text(encoding="utf-8"))
-    return data["version"]
+    match = JSON_VERSION_RE.search(PACKAGE_JSON.read_text(encoding="utf-8"))
+    if not match:
+        raise ValueError(f"No version field found in {PACKAGE_JSON}")
+    return match.group(2)
 
 
 def bump_patch(version: str) -> str:
@@ -52,27 +107,65 @@ def bump_patch(version: str) -> str:
     return ".".join(parts)
 
 
-def update_version(new_version: str) -> None:
-    # package.json
-    pkg = json.loads(PACKAGE_JSON.read_text(encoding="utf-8"))
-    pkg["version"] = new_version
-    PACKAGE_JSON.write_text(json.dumps(pkg, indent=2) + "\n", encoding="utf-8")
+def read_preserving_newlines(path: Path) -> str:
+    """Read ``path`` without translating CRLF line endings to LF."""
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
 
-    # src-tauri/tauri.conf.json
-    conf = json.loads(TAURI_CONF.read_text(encoding="utf-8"))
-    conf["version"] = new_version
-    TAURI_CONF.write_text(json.dumps(conf, indent=2) + "\n", encoding="utf-8")
+
+def update_version(new_version: str, current_version: str) -> bool:
+    """Write ``new_version`` into the version files.
+
+    Returns False without touching anything if the version is unchanged.
+    Files whose content would not change are not rewritten.
+    """
+    if new_version == current_version:
+        return False
+
+    # path -> (current text, updated text)
+    updates: dict[Path, tuple[str, str]] = {}
+
+    # package.json and src-tauri/tauri.conf.json — substitute the version
+    # in place so key order and formatting are left untouched
+    for path in (PACKAGE_JSON, TAURI_CONF):
+        text = read_preserving_newlines(path)
+        updates[path] = (
+            text, JSON_VERSION_RE.sub(rf"\g<1>{new_version}\g<3>", text, count=1),
+        )
 
     # src-tauri/Cargo.toml
-    cargo = CARGO_TOML.read_text(encoding="utf-8")
-    cargo = re.sub(
-        r'^(version\s*=\s*")[\d.]+(")',
-        rf"\g<1>{new_version}\2",
-        cargo,
-        count=1,
-        flags=re.MULTILINE,
+    cargo = read_preserving_newlines(CARGO_TOML)
+    updates[CARGO_TOML] = (
+        cargo, CARGO_VERSION_RE.sub(rf"\g<1>{new_version}\2", cargo, count=1),
     )
-    CARGO_TOML.write_text(cargo, encoding="utf-8")
+
+    write_files_atomically({
+        path: new_text for path, (text, new_text) in updates.items() if new_text != text
+    })
+    return True
+
+
+def write_files_atomically(contents: dict[Path, str]) -> None:
+    """Replace several files without leaving any of them half-written.
+
+    Every file is first written and fsynced to a ``.tmp`` sibling; only once
+    all of them succeeded are they moved into place with ``os.replace``, so
+    a failed write leaves every original untouched.
+    """
+    tmp_paths: dict[Path, Path] = {}
+    try:
+        for path, text in contents.items():
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp_paths[path] = tmp
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+        for path, tmp in tmp_paths.items():
+            os.replace(tmp, path)
+    finally:
+        for tmp in tmp_paths.values():
+            tmp.unlink(missing_ok=True)
 
 
 # --- Smart build detection ---------------------------------------------------
@@ -100,9 +193,8 @@ def compute_rust_hash() -> str:
 
     # Hash Cargo.lock with own-package version stripped (version bumps should
     # not trigger a full rebuild)
-    cargo_lock = ROOT / "src-tauri" / "Cargo.lock"
-    if cargo_lock.exists():
-        lock_text = cargo_lock.read_text(encoding="utf-8")
+    if CARGO_LOCK.exists():
+        lock_text = CARGO_LOCK.read_text(encoding="utf-8")
         lock_text = re.sub(
             r'(name\s*=\s*"cosmos-terminal"\s*\n)version\s*=\s*"[^"]*"',
             r"\1",
@@ -180,35 +272,46 @@ def clear_git_lock() -> None:
         print(f"{YELLOW}Removed stale .git/index.lock from a previous failed run{RESET}")
 
 
+VERSION_FILES = [
+    "package.json", "src-tauri/Cargo.toml",
+    "src-tauri/Cargo.lock", "src-tauri/tauri.conf.json",
+]
+
+
 def _stage_and_commit(version: str) -> None:
-    """Stage version files and commit if there are changes."""
+    """Commit the version files if any of them changed."""
     clear_git_lock()
+    status = subprocess.run(
+        ["git", "status", "--porcelain", "--", *VERSION_FILES],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = [(line[:2], line[3:]) for line in status.stdout.splitlines() if line]
+    if not entries:
+        print(f"{YELLOW}Version bump already committed — skipping commit{RESET}")
+        return
+
+    # `git commit -- <paths>` stages tracked paths itself; only new files
+    # need an explicit add first
+    untracked = [path for code, path in entries if code == "??"]
+    if untracked:
+        subprocess.run(["git", "add", "--", *untracked], cwd=ROOT, check=True)
     subprocess.run(
-        ["git", "add", "package.json", "src-tauri/Cargo.toml",
-         "src-tauri/Cargo.lock", "src-tauri/tauri.conf.json"],
+        ["git", "commit", "-m", f"chore: bump version to {version}",
+         "--", *(path for _, path in entries)],
         cwd=ROOT, check=True,
     )
-    has_staged = subprocess.run(["git", "diff", "--cached", "--quiet"], cwd=ROOT)
-    if has_staged.returncode != 0:
-        subprocess.run(
-            ["git", "commit", "-m", f"chore: bump version to {version}"],
-            cwd=ROOT, check=True,
-        )
-    else:
-        print(f"{YELLOW}Version bump already committed — skipping commit{RESET}")
 
 
 def commit_and_tag(version: str) -> None:
+    """Commit version bump, tag it, and push branch and tag in one push."""
     _stage_and_commit(version)
-    tag_and_push(version)
-
-
-def tag_and_push(version: str) -> None:
-    """Create a git tag and push it to origin."""
     tag = f"v{version}"
     subprocess.run(["git", "tag", tag], cwd=ROOT, check=True)
-    subprocess.run(["git", "push", "origin", tag], cwd=ROOT, check=True)
-    print(f"{GREEN}Tagged {tag} and pushed{RESET}")
+    subprocess.run(
+        ["git", "push", "--atomic", "origin", "HEAD", f"refs/tags/{tag}"],
+        cwd=ROOT, check=True,
+    )
+    print(f"{GREEN}Pushed version bump and tag {tag}{RESET}")
 
 
 def commit_and_push(version: str) -> None:
@@ -250,25 +353,255 @@ def create_release(version: str) -> None:
     if msi.exists():
         notes += f"- **MSI Installer** — `{msi.name}`\n"
 
-    cmd = ["gh", "release", "create", tag, "--title", f"{tag} Release",
-           "--notes", notes] + assets
+    # Create the release as a draft first and upload the installers in
+    # parallel (gh uploads positional assets one after another), then publish
+    # once every asset is in place.
+    cmd = ["gh", "release", "create", tag, "--draft", "--title", f"{tag} Release",
+           "--notes", notes]
     result = subprocess.run(cmd, cwd=ROOT)
+    if result.returncode != 0:
+        print(f"{RED}Failed to create GitHub release{RESET}")
+        return
+
+    uploads = [
+        subprocess.Popen(["gh", "release", "upload", tag, asset], cwd=ROOT)
+        for asset in assets
+    ]
+    failed = [asset for asset, proc in zip(assets, uploads) if proc.wait() != 0]
+    if failed:
+        print(f"{RED}Failed to upload: {', '.join(Path(a).name for a in failed)}{RESET}")
+        print(f"{YELLOW}Release {tag} left as a draft — upload the missing assets "
+              f"and publish it manually{RESET}")
+        return
+
+    result = subprocess.run(["gh", "release", "edit", tag, "--draft=false"], cwd=ROOT)
     if result.returncode == 0:
         print(f"{GREEN}GitHub release {tag} created with {len(assets)} asset(s){RESET}")
     else:
-        print(f"{RED}Failed to create GitHub release{RESET}")
+        print(f"{RED}Assets uploaded but failed to publish draft release {tag}{RESET}")
 
 
 # --- Build helpers -----------------------------------------------------------
 
 
+@lru_cache(maxsize=None)
+def which(name: str) -> str:
+    """Resolve a tool on PATH so it can be spawned without a shell.
+
+    On Windows npm is an ``npm.cmd`` shim that CreateProcess only finds by
+    its full path.
+    """
+    return shutil.which(name) or name
+
+
+def run_tool(cmd: list[str], failure: str, **kwargs) -> subprocess.CompletedProcess:
+    """Run ``cmd`` with its executable resolved via ``which()``.
+
+    If the tool cannot be started at all (e.g. not installed), prints
+    ``failure`` and exits instead of raising.
+    """
+    try:
+        return subprocess.run([which(cmd[0]), *cmd[1:]], **kwargs)
+    except OSError as exc:
+        print(f"{RED}{failure}{RESET}")
+        print(f"{DIM}Could not start {cmd[0]}: {exc}{RESET}")
+        sys.exit(1)
+
+
+def node_modules_matches_lock() -> bool:
+    """True if npm's hidden lockfile records exactly the locked packages.
+
+    Covers installs done by hand (``npm install <pkg>``), which update
+    package-lock.json and node_modules together without touching
+    LOCK_HASH_FILE. Optional packages (e.g. other platforms' binaries) may
+    be absent from node_modules.
+    """
+    if not NPM_HIDDEN_LOCK.exists():
+        return False
+    try:
+        locked = json.loads(PACKAGE_LOCK.read_text(encoding="utf-8")).get("packages", {})
+        installed = json.loads(NPM_HIDDEN_LOCK.read_text(encoding="utf-8")).get("packages", {})
+    except (OSError, ValueError):
+        return False
+
+    for path, entry in locked.items():
+        if not path:
+            continue  # the project itself
+        have = installed.get(path)
+        if have is None:
+            if not entry.get("optional"):
+                return False
+        elif have.get("version") != entry.get("version"):
+            return False
+    return all(path in locked for path in installed)
+
+
 def ensure_node_modules() -> None:
-    if not (ROOT / "node_modules").exists():
-        print(f"{YELLOW}node_modules not found — running npm install{RESET}")
-        result = subprocess.run("npm install", shell=True, cwd=ROOT)
-        if result.returncode != 0:
-            print(f"{RED}npm install failed{RESET}")
-            sys.exit(result.returncode)
+    """Install npm dependencies if node_modules is missing or out of date.
+
+    node_modules counts as up to date when it was installed from the current
+    package-lock.json: either LOCK_HASH_FILE matches, or npm's hidden
+    lockfile shows the same packages (in which case the stamp is refreshed).
+    """
+    if not PACKAGE_LOCK.exists():
+        if not (ROOT / "node_modules").exists():
+            print(f"{YELLOW}node_modules not found — running npm install{RESET}")
+            result = run_tool(["npm", "install"], "npm install failed", cwd=ROOT)
+            if result.returncode != 0:
+                print(f"{RED}npm install failed{RESET}")
+                sys.exit(result.returncode)
+        return
+
+    lock_hash = hashlib.sha256(PACKAGE_LOCK.read_bytes()).hexdigest()
+    if (LOCK_HASH_FILE.exists()
+            and LOCK_HASH_FILE.read_text(encoding="utf-8").strip() == lock_hash):
+        return
+    if node_modules_matches_lock():
+        LOCK_HASH_FILE.write_text(lock_hash, encoding="utf-8")
+        return
+
+    if LOCK_HASH_FILE.exists():
+        print(f"{YELLOW}package-lock.json changed — running npm ci{RESET}")
+    elif (ROOT / "node_modules").exists():
+        print(f"{YELLOW}node_modules install state unknown — running npm ci{RESET}")
+    else:
+        print(f"{YELLOW}node_modules not found — running npm ci{RESET}")
+
+    result = run_tool(["npm", "ci"], "npm ci failed", cwd=ROOT)
+    if result.returncode != 0:
+        print(f"{RED}npm ci failed{RESET}")
+        sys.exit(result.returncode)
+    LOCK_HASH_FILE.write_text(lock_hash, encoding="utf-8")
+
+
+def configure_sccache(env: dict[str, str]) -> bool:
+    """Route rustc through sccache when it is installed and not disabled.
+
+    Respects an explicit RUSTC_WRAPPER already set in the environment,
+    except that --no-cache also disables an inherited sccache wrapper.
+    Returns True if sccache will be used for this build.
+    """
+    if not _use_sccache:
+        # An empty wrapper tells cargo to invoke rustc directly
+        for var in ("RUSTC_WRAPPER", "CARGO_BUILD_RUSTC_WRAPPER"):
+            if env.get(var) and Path(env[var]).stem == "sccache":
+                env[var] = ""
+        return False
+    if not shutil.which("sccache"):
+        return False
+    env.setdefault("RUSTC_WRAPPER", "sccache")
+    if Path(env["RUSTC_WRAPPER"]).stem != "sccache":
+        return False
+    # Reset the server counters so the post-build stats cover this build only
+    subprocess.run(["sccache", "--zero-stats"], capture_output=True)
+    return True
+
+
+def print_sccache_stats() -> None:
+    result = subprocess.run(["sccache", "--show-stats"], capture_output=True, text=True)
+    hits = re.search(r"^Cache hits\s+(\d+)", result.stdout, flags=re.MULTILINE)
+    misses = re.search(r"^Cache misses\s+(\d+)", result.stdout, flags=re.MULTILINE)
+    if hits and misses:
+        print(f"{DIM}sccache: hits={hits.group(1)} misses={misses.group(1)}{RESET}")
+
+
+def is_nightly_toolchain() -> bool:
+    """True if the toolchain cargo will use for src-tauri is a nightly."""
+    try:
+        result = subprocess.run(
+            ["rustc", "-V"], cwd=ROOT / "src-tauri", capture_output=True, text=True,
+        )
+    except OSError:
+        return False
+    return result.returncode == 0 and "-nightly" in result.stdout
+
+
+def fast_linker_flags() -> tuple[str, list[str]]:
+    """Pick a faster linker than the platform default, if one is installed.
+
+    Returns the linker name for display and the rustc flags that select it.
+    """
+    if sys.platform == "win32":
+        if shutil.which("lld-link"):
+            return "lld-link", ["-Clinker=lld-link"]
+    elif sys.platform.startswith("linux"):
+        if shutil.which("mold"):
+            return "mold", ["-Clink-arg=-fuse-ld=mold"]
+        if shutil.which("ld.lld"):
+            return "lld", ["-Clink-arg=-fuse-ld=lld"]
+    return "default", []
+
+
+def find_llvm_profdata() -> Path | None:
+    """Locate llvm-profdata, preferring the rustup llvm-tools component.
+
+    The profile format is tied to the LLVM version rustc was built with, so
+    a system llvm-profdata on PATH is only a fallback.
+    """
+    rust_dir = ROOT / "src-tauri"
+    try:
+        sysroot = subprocess.run(
+            ["rustc", "--print", "sysroot"], cwd=rust_dir, capture_output=True, text=True,
+        ).stdout.strip()
+        version_info = subprocess.run(
+            ["rustc", "-vV"], cwd=rust_dir, capture_output=True, text=True,
+        ).stdout
+    except OSError:
+        sysroot, version_info = "", ""
+    host = re.search(r"^host:\s*(\S+)", version_info, flags=re.MULTILINE)
+    if sysroot and host:
+        exe = "llvm-profdata.exe" if sys.platform == "win32" else "llvm-profdata"
+        candidate = Path(sysroot) / "lib" / "rustlib" / host.group(1) / "bin" / exe
+        if candidate.exists():
+            return candidate
+    found = shutil.which("llvm-profdata")
+    return Path(found) if found else None
+
+
+def with_encoded_rustflags(*flags: str) -> str:
+    """Append ``flags`` to the inherited rustflags for CARGO_ENCODED_RUSTFLAGS.
+
+    Flags are separated by 0x1f instead of whitespace, so they may contain
+    paths with spaces. Starts from CARGO_ENCODED_RUSTFLAGS if set (cargo
+    ignores RUSTFLAGS when it is), otherwise from RUSTFLAGS. Scripts should
+    always pass extra flags this way so none are silently dropped.
+    """
+    encoded = os.environ.get("CARGO_ENCODED_RUSTFLAGS")
+    existing = encoded.split("\x1f") if encoded else os.environ.get("RUSTFLAGS", "").split()
+    return "\x1f".join([*(f for f in existing if f), *flags])
+
+
+def fetch_crates(env: dict[str, str]) -> None:
+    """Download every crate in Cargo.lock, updating the lockfile if needed."""
+    print(f"{CYAN}Fetching crates (cargo fetch){RESET}")
+    result = run_tool(
+        ["cargo", "fetch"], "cargo fetch failed", env=env, cwd=ROOT / "src-tauri",
+    )
+    if result.returncode != 0:
+        print(f"{RED}cargo fetch failed{RESET}")
+        sys.exit(result.returncode)
+
+
+def configure_offline(env: dict[str, str]) -> bool:
+    """Build without registry access when every dependency is already local.
+
+    With --online, crates are fetched once first (refreshing the registry
+    cache and Cargo.lock for new dependencies) so the build itself can then
+    stay offline. Respects an explicit CARGO_NET_OFFLINE in the environment.
+    Returns True if the build will run offline.
+    """
+    global _fetch_before_build
+    if _fetch_before_build:
+        fetch_crates(env)
+        _fetch_before_build = False
+
+    if "CARGO_NET_OFFLINE" in env:
+        return env["CARGO_NET_OFFLINE"].lower() == "true"
+    cargo_home = Path(env.get("CARGO_HOME") or Path.home() / ".cargo")
+    if not CARGO_LOCK.exists() or not (cargo_home / "registry").is_dir():
+        return False
+    env["CARGO_NET_OFFLINE"] = "true"
+    return True
 
 
 def run_cargo_build(env_overrides: dict[str, str] | None = None,
@@ -276,14 +609,38 @@ def run_cargo_build(env_overrides: dict[str, str] | None = None,
     env = os.environ.copy()
     if env_overrides:
         env.update(env_overrides)
+    TARGET_DIR.mkdir(parents=True, exist_ok=True)
+    env["CARGO_TARGET_DIR"] = str(TARGET_DIR)
+    use_sccache = configure_sccache(env)
+    offline_requested = "CARGO_NET_OFFLINE" in env
+    offline = configure_offline(env)
 
-    cmd = "cargo tauri build"
+    cmd = ["cargo", "tauri", "build"]
     if no_bundle:
-        cmd += " --no-bundle"
-
-    print(f"{CYAN}Running: {cmd}{RESET}")
+        cmd.append("--no-bundle")
+
+    print(f"{CYAN}Running: {' '.join(cmd)}{RESET}")
+    print(f"{DIM}Target dir: {TARGET_DIR}{RESET}")
+    if use_sccache:
+        print(f"{DIM}Compilation cache: sccache (disable with --no-cache){RESET}")
+    if offline:
+        fallback = "CARGO_NET_OFFLINE set" if offline_requested else "retries online on failure"
+        print(f"{DIM}Registry: offline ({fallback}){RESET}")
     print("-" * 40)
-    result = subprocess.run(cmd, shell=True, env=env, cwd=ROOT)
+    result = run_tool(cmd, "Build failed", env=env, cwd=ROOT)
+
+    # An offline build fails when a dependency was added or bumped since the
+    # registry cache was last filled — fetch it and try once more online.
+    # An explicit CARGO_NET_OFFLINE=true from the caller is left alone.
+    if result.returncode != 0 and offline and not offline_requested:
+        print(f"{YELLOW}Offline build failed — retrying online{RESET}")
+        del env["CARGO_NET_OFFLINE"]
+        fetch_crates(env)
+        print("-" * 40)
+        result = run_tool(cmd, "Build failed", env=env, cwd=ROOT)
+
+    if use_sccache:
+        print_sccache_stats()
 
     if result.returncode != 0:
         print(f"{RED}Build failed{RESET}")
@@ -294,7 +651,7 @@ def build_frontend_only() -> None:
     """Build frontend assets only (no Rust compilation)."""
     print(f"{CYAN}Building frontend only (npm run build){RESET}")
     print("-" * 40)
-    result = subprocess.run("npm run build", shell=True, cwd=ROOT)
+    result = run_tool(["npm", "run", "build"], "Frontend build failed", cwd=ROOT)
     if result.returncode != 0:
         print(f"{RED}Frontend build failed{RESET}")
         sys.exit(result.returncode)
@@ -307,6 +664,74 @@ def build_frontend_only() -> None:
 
 # --- Install helpers ---------------------------------------------------------
 
+COPY_CHUNK = 8 * 1024 * 1024
+
+
+def copy_large_file(src: Path, dest: Path) -> bool:
+    """Copy ``src`` to ``dest`` with metadata, like ``shutil.copy2``.
+
+    Skips the copy when ``dest`` already has the same size and mtime (copy2
+    preserves mtime, so this means an earlier copy of the same build).
+    Returns False if the copy was skipped.
+    """
+    src_stat = src.stat()
+    if dest.exists():
+        dest_stat = dest.stat()
+        if (dest_stat.st_size == src_stat.st_size
+                and dest_stat.st_mtime_ns == src_stat.st_mtime_ns):
+            return False
+
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+        remaining = src_stat.st_size
+        if hasattr(os, "copy_file_range"):
+            # In-kernel copy (reflink / server-side where supported); some
+            # filesystems and cross-device copies reject it
+            try:
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                remaining = src_stat.st_size
+        if remaining > 0:
+            shutil.copyfileobj(fsrc, fdst, length=COPY_CHUNK)
+    shutil.copystat(src, dest)
+    return True
+
+
+def copy_frontend(frontend_dest: Path) -> bool:
+    """Replace the contents of ``frontend_dest`` with the built ``dist/``.
+
+    The app serves its UI from ``frontend/`` next to the exe. Clears the
+    contents rather than the directory itself, so the Rust FrontendWatcher
+    keeps its file-system handle alive. Returns False if dist/ is missing.
+    """
+    dist_src = ROOT / "dist"
+    if not dist_src.is_dir():
+        print(f"{RED}dist/ directory not found — frontend not installed{RESET}")
+        return False
+
+    if frontend_dest.exists():
+        for child in frontend_dest.iterdir():
+            if child.is_dir():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+    else:
+        frontend_dest.mkdir(parents=True)
+    for child in dist_src.iterdir():
+        dest_child = frontend_dest / child.name
+        if child.is_dir():
+            shutil.copytree(child, dest_child)
+        else:
+            shutil.copy2(child, dest_child)
+    print(f"{GREEN}Installed frontend to {frontend_dest}{RESET}")
+    return True
+
 
 def install_to_app_folder(build_type: str) -> bool:
     """Copy built assets to the app folder.
@@ -318,30 +743,11 @@ def install_to_app_folder(build_type: str) -> bool:
 
     app_dir = Path(APP_DIR_ENV)
     app_dir.mkdir(parents=True, exist_ok=True)
-    dist_src = ROOT / "dist"
     frontend_dest = app_dir / "frontend"
     exe_failed = False
 
-    # Always install frontend assets (clear contents, not the directory itself,
-    # so the Rust FrontendWatcher keeps its file-system handle alive).
-    if dist_src.is_dir():
-        if frontend_dest.exists():
-            for child in frontend_dest.iterdir():
-                if child.is_dir():
-                    shutil.rmtree(child)
-                else:
-                    child.unlink()
-        else:
-            frontend_dest.mkdir(parents=True)
-        for child in dist_src.iterdir():
-            dest_child = frontend_dest / child.name
-            if child.is_dir():
-                shutil.copytree(child, dest_child)
-            else:
-                shutil.copy2(child, dest_child)
-        print(f"{GREEN}Installed frontend to {frontend_dest}{RESET}")
-    else:
-        print(f"{RED}dist/ directory not found — frontend not installed{RESET}")
+    # Always install frontend assets
+    if not copy_frontend(frontend_dest):
         return False
 
     # Install exe only on full builds
@@ -349,8 +755,10 @@ def install_to_app_folder(build_type: str) -> bool:
         if EXE_SRC.exists():
             dest = app_dir / "cosmos-terminal.exe"
             try:
-                shutil.copy2(EXE_SRC, dest)
-                print(f"{GREEN}Installed exe to {dest}{RESET}")
+                if copy_large_file(EXE_SRC, dest):
+                    print(f"{GREEN}Installed exe to {dest}{RESET}")
+                else:
+                    print(f"{DIM}Exe in {app_dir} is already up to date{RESET}")
             except PermissionError:
                 exe_failed = True
                 print(f"{YELLOW}Frontend installed successfully.{RESET}")
@@ -396,8 +804,12 @@ def build_local() -> None:
     print(f"{CYAN}Starting local dev server (cargo tauri dev){RESET}")
     print("-" * 40)
     ensure_node_modules()
+    env = os.environ.copy()
+    env["CARGO_TARGET_DIR"] = str(TARGET_DIR)
     try:
-        result = subprocess.run("cargo tauri dev", shell=True, cwd=ROOT)
+        result = run_tool(
+            ["cargo", "tauri", "dev"], "Dev server failed to start", env=env, cwd=ROOT,
+        )
         sys.exit(result.returncode)
     except KeyboardInterrupt:
         print(f"\n{YELLOW}Stopped.{RESET}")
@@ -416,18 +828,34 @@ def build_dev(force: bool = False) -> None:
         build_type = detect_build_type()
 
     if build_type == "full":
+        env_overrides = {
+            "CARGO_PROFILE_RELEASE_LTO": "thin",
+            "CARGO_PROFILE_RELEASE_CODEGEN_UNITS": "8",
+            "CARGO_PROFILE_RELEASE_OPT_LEVEL": "2",
+            "CARGO_INCREMENTAL": "1",
+        }
+        # Cargo already defaults to the CPUs this process may use (affinity
+        # and cgroup quotas included), so the job count is only reported
+        if hasattr(os, "sched_getaffinity"):
+            cpus = len(os.sched_getaffinity(0))
+        else:
+            cpus = os.cpu_count() or 1
+        jobs = os.environ.get("CARGO_BUILD_JOBS") or f"auto ({cpus} CPUs)"
+        linker, rustflags = fast_linker_flags()
+        # Reuse monomorphized generics across crates (nightly-only flag)
+        share_generics = is_nightly_toolchain()
+        if share_generics:
+            rustflags.append("-Zshare-generics=y")
+        if rustflags:
+            env_overrides["CARGO_ENCODED_RUSTFLAGS"] = with_encoded_rustflags(*rustflags)
+
         print(f"{YELLOW}Full build (Rust + frontend){RESET}")
         print("  LTO: thin | codegen-units: 8 | opt-level: 2 | incremental: on")
+        print(f"  Jobs: {jobs} | "
+              f"share-generics: {'on' if share_generics else 'off (stable toolchain)'} | "
+              f"linker: {linker}")
         print("  Bundling: skipped (exe only)")
-        run_cargo_build(
-            env_overrides={
-                "CARGO_PROFILE_RELEASE_LTO": "thin",
-                "CARGO_PROFILE_RELEASE_CODEGEN_UNITS": "8",
-                "CARGO_PROFILE_RELEASE_OPT_LEVEL": "2",
-                "CARGO_INCREMENTAL": "1",
-            },
-            no_bundle=True,
-        )
+        run_cargo_build(env_overrides=env_overrides, no_bundle=True)
         save_rust_hash()
     else:
         print(f"{GREEN}Frontend-only build (no Rust changes){RESET}")
@@ -442,7 +870,7 @@ def build_release(force: bool = False) -> None:
     # Auto bump patch version (silent)
     current = read_version()
     version = bump_patch(current)
-    update_version(version)
+    update_version(version, current)
     print(f"{GREEN}Version bumped to {version}{RESET}")
 
     if force:
@@ -455,7 +883,8 @@ def build_release(force: bool = False) -> None:
 
     if build_type == "full":
         print(f"{YELLOW}Full build (Rust + frontend){RESET}")
-        run_cargo_build()
+        print("  LTO: fat | codegen-units: 1 | opt-level: 3 | panic: abort | strip: symbols")
+        run_cargo_build(env_overrides=RELEASE_PROFILE_ENV)
         save_rust_hash()
     else:
         print(f"{GREEN}Frontend-only build (no Rust changes){RESET}")
@@ -467,6 +896,96 @@ def build_release(force: bool = False) -> None:
     try_silent_install(build_type)
 
 
+def build_pgo() -> None:
+    """Profile-guided release build.
+
+    Pass 1 builds an instrumented exe and launches it so a training session
+    can be recorded; the profiles are merged with llvm-profdata and pass 2
+    rebuilds (with installers) optimized for the recorded workload.
+    """
+    profdata_tool = find_llvm_profdata()
+    if not profdata_tool:
+        print(f"{RED}llvm-profdata not found{RESET}")
+        print("Install it with: rustup component add llvm-tools-preview")
+        sys.exit(1)
+
+    ensure_node_modules()
+    global _cached_rust_hash
+    _cached_rust_hash = compute_rust_hash()
+
+    pgo_dir = TARGET_DIR / "pgo-data"
+    merged = TARGET_DIR / "pgo-merged.profdata"
+
+    # Pass 1 replaces EXE_SRC with an instrumented binary; drop the stamp so an
+    # aborted or failed run cannot make a later build treat it as current
+    RUST_HASH_FILE.unlink(missing_ok=True)
+
+    print(f"{YELLOW}PGO pass 1/2: instrumented build{RESET}")
+    print("  LTO: fat | codegen-units: 1 | opt-level: 3 | profile-generate")
+    run_cargo_build(
+        env_overrides={
+            **RELEASE_PROFILE_ENV,
+            # Encoded so a target dir path with spaces stays one flag
+            "CARGO_ENCODED_RUSTFLAGS": with_encoded_rustflags(
+                f"-Cprofile-generate={pgo_dir}",
+            ),
+        },
+        no_bundle=True,
+    )
+
+    # Build scripts and proc-macros are instrumented too and already wrote
+    # profiles while pass 1 ran; start the training run from an empty dir so
+    # only the app's own profiles are merged (and a run that records nothing
+    # is caught below)
+    if pgo_dir.exists():
+        shutil.rmtree(pgo_dir)
+    pgo_dir.mkdir(parents=True)
+
+    # The exe serves its UI from frontend/ next to itself, so stage it with
+    # the built dist/ rather than launching it bare from the target dir
+    train_dir = TARGET_DIR / "pgo-app"
+    train_exe = train_dir / EXE_SRC.name
+    train_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(EXE_SRC, train_exe)
+    if not copy_frontend(train_dir / "frontend"):
+        sys.exit(1)
+    (train_dir / "frontend" / "version.json").write_text(
+        json.dumps({"version": read_version()}),
+    )
+
+    print(f"\n{YELLOW}Training run — the instrumented app will now start.{RESET}")
+    print("Exercise the hot paths, then close the app to continue:")
+    print("  - open several files, including a large markdown document")
+    print("  - open a git project and refresh the git sidebar")
+    print("  - run commands with large terminal output (e.g. a recursive listing)")
+    subprocess.run([str(train_exe)], cwd=ROOT)
+
+    if not any(pgo_dir.glob("*.profraw")):
+        print(f"{RED}The app wrote no profile data to {pgo_dir}{RESET}")
+        sys.exit(1)
+    result = subprocess.run(
+        [str(profdata_tool), "merge", "-o", str(merged), str(pgo_dir)], cwd=ROOT,
+    )
+    if result.returncode != 0:
+        print(f"{RED}llvm-profdata merge failed{RESET}")
+        sys.exit(result.returncode)
+
+    print(f"\n{YELLOW}PGO pass 2/2: optimized build{RESET}")
+    print("  LTO: fat | codegen-units: 1 | opt-level: 3 | profile-use")
+    run_cargo_build(
+        env_overrides={
+            **RELEASE_PROFILE_ENV,
+            "CARGO_ENCODED_RUSTFLAGS": with_encoded_rustflags(
+                f"-Cprofile-use={merged}", "-Cllvm-args=-pgo-warn-missing-function",
+            ),
+        },
+    )
+    save_rust_hash()
+    print(f"{GREEN}PGO build complete{RESET}")
+
+    install_prompt("full")
+
+
 def build_interactive() -> None:
     ensure_node_modules()
 
@@ -485,14 +1004,15 @@ def build_interactive() -> None:
         print(f"Keeping version {current}")
     elif bump_choice.lower() in ("", "y", "yes"):
         version = next_ver
-        update_version(version)
-        bumped = True
+        bumped = update_version(version, current)
         print(f"{GREEN}Version bumped to {version}{RESET}")
     else:
         version = bump_choice
-        update_version(version)
-        bumped = True
-        print(f"{GREEN}Version set to {version}{RESET}")
+        bumped = update_version(version, current)
+        if bumped:
+            print(f"{GREEN}Version set to {version}{RESET}")
+        else:
+            print(f"Version is already {current} — nothing to bump")
 
     # --- Build ---------------------------------------------------------------
     build_type = detect_build_type()
@@ -508,7 +1028,8 @@ def build_interactive() -> None:
 
     if build_type == "full":
         print(f"{YELLOW}Full build (Rust + frontend){RESET}")
-        run_cargo_build()
+        print("  LTO: fat | codegen-units: 1 | opt-level: 3 | panic: abort | strip: symbols")
+        run_cargo_build(env_overrides=RELEASE_PROFILE_ENV)
         save_rust_hash()
     else:
         print(f"{GREEN}Frontend-only build (no Rust changes){RESET}")
@@ -516,14 +1037,14 @@ def build_interactive() -> None:
 
     # --- Publish -------------------------------------------------------------
     if bumped:
-        commit_and_push(version)
-
         publish = input(
             f"\n{YELLOW}Create tag, generate release notes, and upload to GitHub? [y/N] {RESET}"
         ).strip().lower()
         if publish in ("y", "yes"):
-            tag_and_push(version)
+            commit_and_tag(version)
             create_release(version)
+        else:
+            commit_and_push(version)
 
     # --- Install -------------------------------------------------------------
     install_prompt(build_type)
@@ -540,7 +1061,8 @@ def main() -> None:
                "  python scripts/build.py              # Interactive build\n"
                "  python scripts/build.py --dev        # Fast local build\n"
                "  python scripts/build.py --release    # Silent release build\n"
-               "  python scripts/build.py --local      # Dev server with hot reload",
+               "  python scripts/build.py --local      # Dev server with hot reload\n"
+               "  python scripts/build.py --pgo        # Profile-guided release build",
     )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -555,12 +1077,35 @@ def main() -> None:
         "--local", action="store_true",
         help="Dev server with hot reload (cargo tauri dev)",
     )
+    group.add_argument(
+        "--pgo", action="store_true",
+        help="Profile-guided release build (instrumented build, training run, rebuild)",
+    )
     parser.add_argument(
         "--force", action="store_true",
         help="Force full Rust rebuild (ignores smart detection)",
     )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Do not use sccache for Rust compilation even if it is installed",
+    )
+    parser.add_argument(
+        "--online", action="store_true",
+        help="Fetch crates from the registry before building "
+             "(needed after adding or updating dependencies)",
+    )
+    parser.add_argument(
+        "--target-dir", type=Path, metavar="DIR",
+        help=f"Cargo target directory (default: {TARGET_DIR})",
+    )
     args = parser.parse_args()
 
+    global _use_sccache, _fetch_before_build
+    _use_sccache = not args.no_cache
+    _fetch_before_build = args.online
+    if args.target_dir:
+        set_target_dir(args.target_dir)
+
     if args.force and not (args.dev or args.release):
         print(f"{YELLOW}--force has no effect without --dev or --release{RESET}")
 
@@ -570,6 +1115,8 @@ def main() -> None:
         build_dev(force=args.force)
     elif args.release:
         build_release(force=args.force)
+    elif args.pgo:
+        build_pgo()
     else:
         build_interactive()
 
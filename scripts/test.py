@@ -1,14 +1,26 @@
+import argparse
+import codecs
+import io
 import os
 import re
+import shutil
 import subprocess
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Sibling script; shares build.py's Cargo target dir so tests reuse its artifacts
+from build import default_target_dir
 
 ROOT = Path(__file__).resolve().parent.parent
 RUST_ROOT = ROOT / "src-tauri"
+RUST_ENV = {"CARGO_TARGET_DIR": str(default_target_dir())}
 LOG_ROOT = ROOT / "logs" / "test"
 
 # ANSI palette (minimal + readable)
@@ -22,17 +34,58 @@ RED = "\033[31m"
 
 
 class Step:
-    def __init__(self, name: str, cmd: str, cwd: Path, desc: str = ""):
+    def __init__(
+        self,
+        name: str,
+        cmd: List[str],
+        cwd: Path,
+        desc: str = "",
+        group: Optional[str] = None,
+        exclusive: bool = False,
+        env: Optional[Dict[str, str]] = None,
+    ):
         self.name = name
         self.cmd = cmd
         self.cwd = cwd
         self.desc = desc
+        # Steps sharing a group run sequentially (in declaration order);
+        # distinct groups run in parallel.
+        self.group = group or name
+        # Exclusive steps run alone, after every parallel group has finished
+        self.exclusive = exclusive
+        # Variables added to the inherited environment
+        self.env = env
+
+
+# Lines shown from the end of a failed step's output
+FAIL_TAIL_LINES = 12
+# Trailing characters of output kept per step and scanned for the summary
+# hint (every hint comes from the tool's final summary)
+HINT_WINDOW = 4096
+# Max bytes taken from a step's output pipe per read
+READ_CHUNK = 65536
+
+# Serializes console output from concurrently running steps
+PRINT_LOCK = threading.Lock()
 
 
 ANSI_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
 
 
+@lru_cache(maxsize=None)
+def which(name: str) -> str:
+    """Resolve a tool on PATH so it can be spawned without a shell.
+
+    On Windows npm/npx are ``.cmd`` shims that CreateProcess only finds by
+    their full path.
+    """
+    return shutil.which(name) or name
+
+
 def strip_ansi(text: str) -> str:
+    # Most tool output has no escape sequences at all; skip the regex scan
+    if "\x1b" not in text:
+        return text
     return ANSI_RE.sub("", text)
 
 
@@ -45,31 +98,43 @@ def sec(duration: float) -> str:
 
 
 def hr() -> None:
-    print(f"{DIM}{'-' * 64}{RESET}", flush=True)
+    print(f"{DIM}{'-' * 64}{RESET}")
+
+
+class HintRule:
+    def __init__(self, cmd: str, pattern: str, template: str,
+                 window: int = HINT_WINDOW, flags: int = 0):
+        self.cmd = cmd
+        self.pattern = re.compile(pattern, flags)
+        self.template = template
+        self.window = window
+
+
+# First rule whose ``cmd`` is a substring of the step command applies
+HINT_RULES = [
+    HintRule("npm run test:", r"Tests\s+(\d+)\s+passed", "{0} tests passed"),
+    HintRule("cargo test", r"test result: ok\.\s+(\d+)\s+passed;\s+(\d+)\s+failed;",
+             "{0} passed, {1} failed"),
+    HintRule("cargo clippy", r"\bFinished\b", "no clippy errors"),
+    HintRule("npm run build", r"built in ([\d.]+s)", "vite built in {0}"),
+    # The bench results table sits further from the end than the others
+    HintRule("npm run bench:", r"output flush latency.*?mean\s+([\d.]+)",
+             "flush mean {0}ms", window=16384, flags=re.S),
+]
+
+
+def hint_rule(step: Step) -> Optional[HintRule]:
+    cmd = " ".join(step.cmd)
+    return next((rule for rule in HINT_RULES if rule.cmd in cmd), None)
 
 
 def extract_hint(step: Step, output: str) -> Optional[str]:
-    plain = strip_ansi(output)
-    if "vitest run" in step.cmd:
-        m = re.search(r"Tests\s+(\d+)\s+passed", plain)
-        if m:
-            return f"{m.group(1)} tests passed"
-    if "cargo test" in step.cmd:
-        m = re.search(r"test result: ok\.\s+(\d+)\s+passed;\s+(\d+)\s+failed;", plain)
-        if m:
-            return f"{m.group(1)} passed, {m.group(2)} failed"
-    if "cargo clippy" in step.cmd:
-        if "Finished" in plain and "error:" not in plain.lower():
-            return "no clippy errors"
-    if "npm run build" in step.cmd:
-        m = re.search(r"built in ([\d.]+s)", plain)
-        if m:
-            return f"vite built in {m.group(1)}"
-    if "vitest bench" in step.cmd:
-        m = re.search(r"output flush latency.*?mean\s+([\d.]+)", plain, flags=re.S)
-        if m:
-            return f"flush mean {m.group(1)}ms"
-    return None
+    """Summarize a passing step from the tail of its output."""
+    rule = hint_rule(step)
+    if rule is None:
+        return None
+    m = rule.pattern.search(strip_ansi(output[-rule.window:]))
+    return rule.template.format(*m.groups()) if m else None
 
 
 def run_step(
@@ -77,47 +142,109 @@ def run_step(
     total: int,
     step: Step,
     run_log_dir: Path,
+    live: bool = False,
 ) -> Tuple[bool, int, float, Path]:
-    print(f"{BOLD}{CYAN}[{index}/{total}] {step.name}{RESET}", flush=True)
-    if step.desc:
-        print(f"{DIM}    {step.desc}{RESET}", flush=True)
-    print(f"{DIM}$ {step.cmd}{RESET}", flush=True)
+    with PRINT_LOCK:
+        print(f"{BOLD}{CYAN}[{index}/{total}] {step.name}{RESET}")
+        if step.desc:
+            print(f"{DIM}    {step.desc}{RESET}")
+        print(f"{DIM}$ {' '.join(step.cmd)}{RESET}")
+        hr()
+        sys.stdout.flush()
+
+    log_file = run_log_dir / f"{index:02d}-{safe_name(step.name)}.log"
+    rule = hint_rule(step)
+    window = rule.window if rule else HINT_WINDOW
+    tail: Deque[str] = deque()
+    tail_chars = 0
 
     started = time.perf_counter()
-    result = subprocess.run(
-        step.cmd,
-        shell=True,
-        cwd=step.cwd,
-        check=False,
-        capture_output=True,
-    )
+    with log_file.open("w", encoding="utf-8", errors="replace") as log:
+        try:
+            proc = subprocess.Popen(
+                [which(step.cmd[0]), *step.cmd[1:]],
+                cwd=step.cwd,
+                env={**os.environ, **step.env} if step.env else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+            )
+        except OSError as exc:
+            # Missing tool: report it like the shell would (exit 127)
+            message = f"failed to start {step.cmd[0]}: {exc}\n"
+            log.write(message)
+            tail.append(message)
+            returncode = 127
+        else:
+            assert proc.stdout is not None
+            # Decode and normalize newlines across chunk boundaries, as a
+            # text-mode pipe would
+            decoder = io.IncrementalNewlineDecoder(
+                codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True,
+            )
+            fd = proc.stdout.fileno()
+            while True:
+                # Returns whatever is available (up to READ_CHUNK), so a burst
+                # of lines is handled at once and nothing waits for more input
+                data = os.read(fd, READ_CHUNK)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    log.write(text)
+                    tail.append(text)
+                    tail_chars += len(text)
+                    while len(tail) > 1 and tail_chars - len(tail[0]) >= window:
+                        tail_chars -= len(tail.popleft())
+                    if live:
+                        # One write and flush per chunk (only one step runs)
+                        sys.stdout.write(text)
+                        sys.stdout.flush()
+                if not data:
+                    break
+            proc.stdout.close()
+            returncode = proc.wait()
     duration = time.perf_counter() - started
-    output = (result.stdout or b"") + (result.stderr or b"")
-    output_text = output.decode("utf-8", errors="replace")
 
-    log_file = run_log_dir / f"{index:02d}-{safe_name(step.name)}.log"
-    log_file.write_text(output_text, encoding="utf-8", errors="replace")
-    hint = extract_hint(step, output_text)
+    tail_text = "".join(tail)
 
-    if result.returncode == 0:
+    if returncode == 0:
+        hint = extract_hint(step, tail_text)
         line = f"{GREEN}PASS{RESET} {step.name} {DIM}({sec(duration)}){RESET}"
         if hint:
             line += f" {DIM}| {hint}{RESET}"
-        print(line, flush=True)
+        with PRINT_LOCK:
+            print(line)
+            hr()
+            sys.stdout.flush()
         return True, 0, duration, log_file
 
-    print(
-        f"{RED}FAIL{RESET} {step.name} "
-        f"{DIM}(exit {result.returncode}, {sec(duration)}){RESET}"
-    , flush=True)
-    print(f"{DIM}log: {log_file}{RESET}", flush=True)
+    fail_tail = strip_ansi(tail_text).strip().splitlines()[-FAIL_TAIL_LINES:]
+    with PRINT_LOCK:
+        print(
+            f"{RED}FAIL{RESET} {step.name} "
+            f"{DIM}(exit {returncode}, {sec(duration)}){RESET}"
+        )
+        print(f"{DIM}log: {log_file}{RESET}")
+        if fail_tail:
+            print(f"{DIM}tail:{RESET}")
+            for line in fail_tail:
+                print(f"{DIM}  {line}{RESET}")
+        hr()
+        sys.stdout.flush()
+    return False, returncode, duration, log_file
+
 
-    tail = strip_ansi(output_text).strip().splitlines()[-12:]
-    if tail:
-        print(f"{DIM}tail:{RESET}", flush=True)
-        for line in tail:
-            print(f"{DIM}  {line}{RESET}", flush=True)
-    return False, result.returncode, duration, log_file
+def run_group(
+    group: List[Tuple[int, Step]],
+    total: int,
+    run_log_dir: Path,
+    live: bool = False,
+) -> List[Tuple[int, Step, bool, int, float, Path]]:
+    """Run the steps of one group back to back, in declaration order."""
+    results = []
+    for idx, step in group:
+        ok, code, duration, log_file = run_step(idx, total, step, run_log_dir, live)
+        results.append((idx, step, ok, code, duration, log_file))
+    return results
 
 
 def print_summary(
@@ -130,18 +257,17 @@ def print_summary(
 
     print()
     hr()
-    print(f"{BOLD}Summary{RESET}", flush=True)
+    print(f"{BOLD}Summary{RESET}")
     print(
         f"  {GREEN}Passed:{RESET} {passed}  "
         f"{RED}Failed:{RESET} {failed}  "
         f"{DIM}Total: {len(results)} | Time: {sec(total_duration)}{RESET}",
-        flush=True,
     )
-    print(f"  {DIM}Logs: {run_log_dir}{RESET}", flush=True)
+    print(f"  {DIM}Logs: {run_log_dir}{RESET}")
 
     if failed:
         print()
-        print(f"{BOLD}{YELLOW}Failed Steps{RESET}", flush=True)
+        print(f"{BOLD}{YELLOW}Failed Steps{RESET}")
         for step, ok, code, duration, log_file in results:
             if ok:
                 continue
@@ -149,56 +275,91 @@ def print_summary(
                 f"  {RED}- {step.name}{RESET} "
                 f"{DIM}(exit {code}, {sec(duration)}){RESET}"
                 f"\n    {DIM}{log_file}{RESET}",
-                flush=True,
             )
 
     print()
     hr()
+    sys.stdout.flush()
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Cosmos Terminal test pipeline")
+    parser.add_argument(
+        "--serial", action="store_true",
+        help="Run one step at a time and stream its output to the terminal",
+    )
+    args = parser.parse_args()
+
     run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
     run_log_dir = LOG_ROOT / run_id
     run_log_dir.mkdir(parents=True, exist_ok=True)
 
     print()
-    print(f"{BOLD}Cosmos Terminal Test Pipeline{RESET}", flush=True)
-    print(f"{DIM}{ROOT}{RESET}", flush=True)
+    print(f"{BOLD}Cosmos Terminal Test Pipeline{RESET}")
+    print(f"{DIM}{ROOT}{RESET}")
     hr()
+    sys.stdout.flush()
 
     steps = [
-        Step("ESLint", "npm run lint", ROOT,
+        Step("ESLint", ["npm", "run", "lint"], ROOT,
              "Catches unused vars, bad patterns, and style violations across all TS files"),
-        Step("Integration Tests", "npm run test:integration", ROOT,
+        Step("Integration Tests", ["npm", "run", "test:integration"], ROOT,
              "IPC contract sync, markdown XSS hardening, CSS layout invariants, "
              "git sidebar rendering, file-tab lifecycle, and Tauri permission auditing"),
-        Step("Stress Tests", "npm run test:stress", ROOT,
+        Step("Stress Tests", ["npm", "run", "test:stress"], ROOT,
              "High-volume terminal output with scroll-pinning and position "
              "preservation under randomised burst/scroll/hide sequences"),
-        Step("Frontend Benchmarks", "npm run bench:frontend", ROOT,
+        Step("Frontend Benchmarks", ["npm", "run", "bench:frontend"], ROOT,
              "Measures output flush latency, resize/fit latency, "
-             "and IPC dispatch counts to catch performance regressions"),
-        Step("TypeScript Typecheck", "npx tsc --noEmit", ROOT,
+             "and IPC dispatch counts to catch performance regressions",
+             exclusive=True),
+        Step("TypeScript Typecheck", ["npx", "tsc", "--noEmit"], ROOT,
              "Full strict-mode type check - catches type errors, "
              "unused locals/params, and missing annotations"),
-        Step("Frontend Build", "npm run build", ROOT,
+        Step("Frontend Build", ["npm", "run", "build"], ROOT,
              "Vite production bundle - verifies no import errors, "
              "tree-shaking issues, or asset pipeline failures"),
-        Step("Rust Clippy", "cargo clippy --all-targets --all-features", RUST_ROOT,
+        # Clippy and the unit tests share build.py's target dir (and cargo's
+        # build lock), so they run back to back rather than contending for it.
+        Step("Rust Clippy", ["cargo", "clippy", "--all-targets", "--all-features"], RUST_ROOT,
              "Rust linter catching correctness bugs, performance pitfalls, "
-             "and non-idiomatic patterns in the backend"),
-        Step("Rust Unit Tests", "cargo test --lib", RUST_ROOT,
+             "and non-idiomatic patterns in the backend", group="rust", env=RUST_ENV),
+        Step("Rust Unit Tests", ["cargo", "test", "--lib"], RUST_ROOT,
              "FS security (path traversal, system dir rejection), directory listing, "
-             "file search, binary detection, and shell path validation"),
+             "file search, binary detection, and shell path validation",
+             group="rust", env=RUST_ENV),
     ]
 
-    pipeline_started = time.perf_counter()
-    results: List[Tuple[Step, bool, int, float, Path]] = []
-
+    groups: Dict[str, List[Tuple[int, Step]]] = {}
+    exclusive: List[Tuple[int, Step]] = []
     for idx, step in enumerate(steps, start=1):
-        ok, code, duration, log_file = run_step(idx, len(steps), step, run_log_dir)
-        results.append((step, ok, code, duration, log_file))
-        hr()
+        if step.exclusive:
+            exclusive.append((idx, step))
+        else:
+            groups.setdefault(step.group, []).append((idx, step))
+
+    pipeline_started = time.perf_counter()
+    indexed: List[Tuple[int, Step, bool, int, float, Path]] = []
+
+    # Live output is only readable when a single step is running
+    workers = 1 if args.serial else min(len(groups), os.cpu_count() or 1)
+    live = workers == 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_group, group, len(steps), run_log_dir, live)
+            for group in groups.values()
+        ]
+        for future in as_completed(futures):
+            indexed.extend(future.result())
+
+    # Benchmarks measure latency, so they must not compete with other steps
+    indexed.extend(run_group(exclusive, len(steps), run_log_dir, live))
+
+    indexed.sort(key=lambda item: item[0])
+    results: List[Tuple[Step, bool, int, float, Path]] = [
+        (step, ok, code, duration, log_file)
+        for _, step, ok, code, duration, log_file in indexed
+    ]
 
     total_duration = time.perf_counter() - pipeline_started
     print_summary(results, total_duration, run_log_dir)
@@ -208,5 +369,7 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # Block-buffer stdout; output is flushed explicitly at step boundaries
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
     os.chdir(ROOT)
     sys.exit(main())